@@ -0,0 +1,55 @@
+
+import os
+from docx import Document
+from docx.shared import Pt
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+# Authors report_template.docx, the layout shared by app.py and momentum_report.py.
+# Reports are rendered by substituting the {{FIELD}} placeholders in word/document.xml;
+# a paragraph whose field is set to None is dropped. Re-run after changing the layout.
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "report_template.docx")
+
+def main():
+    doc = Document()
+    title = doc.add_paragraph("Momentum Report")
+    title.runs[0].font.size = Pt(20)
+    title.runs[0].bold = True
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    pdate = doc.add_paragraph("Report Date: {{REPORT_DATE}}")
+    pdate.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    doc.add_paragraph("")
+
+    doc.add_paragraph("Summary", style=None).runs[0].bold = True
+    doc.add_paragraph("Active: {{ACTIVE_COUNT}}")
+    doc.add_paragraph("Pending: {{PENDING_COUNT}}")
+    doc.add_paragraph("Solds (last {{DAYS}}d): {{SOLD_WINDOW_COUNT}}")
+    doc.add_paragraph("Months of Inventory (MOI): {{MOI}}")
+
+    doc.add_paragraph("Price Ranges", style=None).runs[0].bold = True
+    doc.add_paragraph("Active List Price Range: {{ACTIVE_RANGE}}")
+    doc.add_paragraph("Pending List Price Range: {{PENDING_RANGE}}")
+    doc.add_paragraph("Closed Net Price Range ({{DAYS}}d): {{SOLD_NET_RANGE}}")
+
+    doc.add_paragraph("Days in MLS (Closed, Window)", style=None).runs[0].bold = True
+    doc.add_paragraph("Using column: {{DOM_COLUMN}}")
+    doc.add_paragraph("Average DaysInMLS: {{AVG_DOM}}")
+    doc.add_paragraph("Median DaysInMLS: {{MEDIAN_DOM}}")
+    doc.add_paragraph("{{DOM_MISSING}}")
+
+    doc.add_paragraph("")
+    doc.add_paragraph("Formula", style=None).runs[0].bold = True
+    doc.add_paragraph("MOI = Active / ((Solds_{{DAYS}}d / 3) + Pending)")
+
+    doc.add_paragraph("")
+    doc.add_paragraph("Disclaimer", style=None).runs[0].bold = True
+    doc.add_paragraph(
+        "This report is generated from the provided MLS export. Field names are expected to match the fixed set; "
+        "optional fields like Seller Concessions and DaysInMLS may be omitted."
+    )
+
+    doc.save(TEMPLATE_PATH)
+    print("Template saved:", TEMPLATE_PATH)
+
+if __name__ == "__main__":
+    main()
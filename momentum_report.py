@@ -1,12 +1,13 @@
 
 import argparse
+import io
 import os
-from datetime import datetime, timedelta
+import re
+import zipfile
+from datetime import date, datetime, timedelta
+from xml.sax.saxutils import escape
 import numpy as np
 import pandas as pd
-from docx import Document
-from docx.shared import Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
 
 REQUIRED_COLUMNS = [
     "Mls Status",
@@ -16,156 +17,249 @@ REQUIRED_COLUMNS = [
     # Optional: "Seller Concessions", "DaysInMLS" or "Days in MLS"
 ]
 
+# Everything the report reads besides the DOM column; other export columns are
+# skipped at parse time
+REPORT_COLUMNS = REQUIRED_COLUMNS + ["Seller Concessions"]
+DATE_COLUMNS = ["Close Date"]
+
 ACTIVE_KEYS = ["active", "coming soon", "back on market", "a/"]
 PENDING_KEYS = ["pending", "under contract", "a/i", "accepting backup"]
 SOLD_KEYS = ["closed", "sold"]
+BUCKETS = ["Active", "Pending", "Sold", "Other", "Unknown"]
 
-def to_num(x):
-    if pd.isna(x):
-        return np.nan
-    s = str(x).replace("$", "").replace(",", "").strip()
-    try:
-        return float(s)
-    except Exception:
-        return np.nan
-
-def bucket_status(s: str) -> str:
-    if pd.isna(s):
-        return "Unknown"
-    s = str(s).strip().lower()
-    # Active if contains any active key AND not pending/UC
-    if any(k in s for k in ACTIVE_KEYS) and not any(k in s for k in ["under contract", "pending"]):
-        return "Active"
-    if any(k in s for k in PENDING_KEYS):
-        return "Pending"
-    if any(k in s for k in SOLD_KEYS):
-        return "Sold"
-    if s == "active":
-        return "Active"
-    return "Other"
-
-def get_dom_series(df: pd.DataFrame) -> pd.Series:
-    dom_col = None
+# Plain pattern strings, not re.compile(): see _parse_money
+ACTIVE_RE = "|".join(map(re.escape, ACTIVE_KEYS))
+PENDING_RE = "|".join(map(re.escape, PENDING_KEYS))
+SOLD_RE = "|".join(map(re.escape, SOLD_KEYS))
+UC_RE = "under contract|pending"
+
+def _parse_money(s: pd.Series) -> np.ndarray:
+    # Exports repeat the same prices many times over: parse each distinct string
+    # once and scatter back through the factorized codes (-1 = missing -> NaN).
+    codes, uniques = pd.factorize(s)
+    # Two literal replaces beat one "[$,]" regex, and a compiled re.Pattern would
+    # push Arrow-backed strings onto pandas' per-element Python fallback.
+    cleaned = pd.Series(uniques).str.replace("$", "", regex=False).str.replace(",", "", regex=False).str.strip()
+    parsed = pd.to_numeric(cleaned, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    # Whole-dollar prices up to 2**24 are exact in float32, so the gather writes half
+    # the bytes; the check runs on the distinct values only, and float64 is kept
+    # when narrowing would change any of them.
+    lut = np.append(parsed, np.nan)
+    narrow = lut.astype(np.float32)
+    if np.array_equal(narrow, lut, equal_nan=True):
+        lut = narrow
+    return lut[codes]
+
+def _nan_min_max(values: np.ndarray):
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return np.nan, np.nan
+    return float(np.min(values)), float(np.max(values))
+
+def _nan_mean_median(values: np.ndarray):
+    values = values[~np.isnan(values)]
+    n = values.size
+    if not n:
+        return np.nan, np.nan
+    # One O(n) partition places both middle elements; no full sort
+    k = n // 2
+    part = np.partition(values, [k - 1, k])
+    median = part[k] if n % 2 else (part[k - 1] + part[k]) / 2
+    return float(values.mean()), float(median)
+
+def bucket_status_vec(s: pd.Series) -> pd.Series:
+    # Missing -> Unknown; Active if contains any active key AND not pending/UC;
+    # then Pending, then Sold; anything else is Other.
+    # An export only has a handful of distinct statuses, so classify those and
+    # scatter the result back through the factorized codes.
+    codes, uniques = pd.factorize(s)
+    low = pd.Series(uniques).str.strip().str.lower()
+    active = low.str.contains(ACTIVE_RE, regex=True, na=False) & ~low.str.contains(UC_RE, regex=True, na=False)
+    pending = low.str.contains(PENDING_RE, regex=True, na=False)
+    sold = low.str.contains(SOLD_RE, regex=True, na=False)
+    labels = np.select(
+        [active.to_numpy(), pending.to_numpy(), sold.to_numpy()],
+        ["Active", "Pending", "Sold"],
+        default="Other",
+    )
+    # Trailing entry catches factorize's -1 code for missing values
+    lookup = np.append(pd.Categorical(labels, categories=BUCKETS).codes, BUCKETS.index("Unknown"))
+    return pd.Series(pd.Categorical.from_codes(lookup[codes], categories=BUCKETS), index=s.index)
+
+def find_dom_column(df: pd.DataFrame):
     if "DaysInMLS" in df.columns:
-        dom_col = "DaysInMLS"
-    elif "Days in MLS" in df.columns:
-        dom_col = "Days in MLS"
+        return "DaysInMLS"
+    if "Days in MLS" in df.columns:
+        return "Days in MLS"
+    return None
+
+def get_dom_series(df: pd.DataFrame, dom_col) -> pd.Series:
     if dom_col is None:
-        return pd.Series([np.nan] * len(df))
-    try:
-        return pd.to_numeric(df[dom_col].astype(str).str.replace(",", "", regex=False), errors="coerce")
-    except Exception:
-        return pd.to_numeric(df[dom_col], errors="coerce")
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[dom_col].str.replace(",", "", regex=False), errors="coerce").astype(float)
 
-def main():
-    parser = argparse.ArgumentParser(description="Generate Momentum Report from MLS CSV (no charts).")
-    parser.add_argument("csv_path", help="Path to the CSV file with required fields.")
-    parser.add_argument("--days", type=int, default=90, help="Window (days) for solds, default 90.")
-    args = parser.parse_args()
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
 
-    csv_path = args.csv_path
-    if not os.path.exists(csv_path):
-        raise SystemExit(f"File not found: {csv_path}")
+def read_mls_csv(source, find_dom=find_dom_column) -> pd.DataFrame:
+    header = pd.read_csv(source, nrows=0)
+    # Only decode the columns the report reads; exports often carry dozens more
+    dom_col = find_dom(header)
+    usecols = [c for c in header.columns if c in REPORT_COLUMNS or c == dom_col]
+    # Prefer Arrow's multithreaded reader with Arrow-backed strings; Close Date
+    # is left as text there and converted by pd.to_datetime downstream.
+    try:
+        _rewind(source)
+        return pd.read_csv(source, engine="pyarrow", usecols=usecols, dtype={c: "string[pyarrow]" for c in usecols})
+    except (ImportError, ValueError):
+        pass
+    # C engine fallback (no pyarrow, or a file Arrow can't parse). Peeking at the
+    # header keeps parse_dates to columns that are present.
+    _rewind(source)
+    parse_dates = [c for c in DATE_COLUMNS if c in usecols]
+    dtype = {c: str for c in usecols if c not in parse_dates}
+    return pd.read_csv(source, usecols=usecols, dtype=dtype, parse_dates=parse_dates)
 
-    df = pd.read_csv(csv_path, dtype=str)
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "report_template.docx")
 
-    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
-    if missing:
-        raise SystemExit(f"Missing required columns: {missing}")
+def render_docx(fields: dict) -> bytes:
+    # Fill the {{FIELD}} placeholders authored by make_template.py straight into
+    # word/document.xml; a field set to None drops its whole paragraph.
+    with zipfile.ZipFile(TEMPLATE_PATH) as src:
+        xml = src.read("word/document.xml").decode("utf-8")
+        for key, value in fields.items():
+            token = "{{%s}}" % key
+            if value is None:
+                xml = re.sub(r"<w:p\b(?:(?!</w:p>).)*?" + re.escape(token) + r".*?</w:p>", "", xml, flags=re.S)
+            else:
+                xml = xml.replace(token, escape(str(value)))
+        out = io.BytesIO()
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as dst:
+            for item in src.infolist():
+                data = xml.encode("utf-8") if item.filename == "word/document.xml" else src.read(item)
+                dst.writestr(item, data)
+    return out.getvalue()
+
+def compute_stats(df: pd.DataFrame, days: int, today: date, dom_col) -> dict:
+    stats = {
+        "active_count": 0,
+        "pending_count": 0,
+        "sold_window_count": 0,
+        "moi": np.nan,
+        "active_range": (np.nan, np.nan),
+        "pending_range": (np.nan, np.nan),
+        "sold_net_range": (np.nan, np.nan),
+        "avg_dom": np.nan,
+        "median_dom": np.nan,
+    }
+    if df.empty:
+        # Header-only export: every figure is zero or N/A, so skip the column parsing
+        return stats
 
     has_concessions = "Seller Concessions" in df.columns
 
-    # Prep
-    df["_bucket"] = df["Mls Status"].apply(bucket_status)
-    df["_close_date"] = pd.to_datetime(df["Close Date"], errors="coerce", infer_datetime_format=True)
-    df["_list_price"] = df["List Price"].apply(to_num)
-    df["_close_price"] = df["Close Price"].apply(to_num)
-    df["_concessions"] = df["Seller Concessions"].apply(to_num) if has_concessions else 0.0
-    df["_dom"] = get_dom_series(df)
+    # Prep: helper columns as plain numpy arrays rather than new DataFrame columns
+    bucket_codes = bucket_status_vec(df["Mls Status"]).cat.codes.to_numpy()
+    list_price = _parse_money(df["List Price"])
+    close_price = _parse_money(df["Close Price"])
+    concessions = _parse_money(df["Seller Concessions"]) if has_concessions else 0.0
+    dom = get_dom_series(df, dom_col).to_numpy()
 
     # Solds window
-    today = datetime.today()
-    window_start = today - timedelta(days=args.days)
-    is_sold_window = (df["_bucket"] == "Sold") & (df["_close_date"] >= window_start)
+    window_start = today - timedelta(days=days)
+    # Only sold rows need the date test; keep their positions rather than a full-length mask
+    sold_rows = np.flatnonzero(bucket_codes == BUCKETS.index("Sold"))
+    if sold_rows.size:
+        closes = pd.to_datetime(df["Close Date"], errors="coerce").to_numpy()
+        sold_window_rows = sold_rows[closes[sold_rows] >= np.datetime64(window_start)]
+    else:
+        # Nothing sold, so there are no close dates worth parsing
+        sold_window_rows = sold_rows
 
     # Counts
-    active_count = int((df["_bucket"] == "Active").sum())
-    pending_count = int((df["_bucket"] == "Pending").sum())
-    sold_window_count = int(is_sold_window.sum())
+    counts = np.bincount(bucket_codes, minlength=len(BUCKETS))
+    active_count = int(counts[BUCKETS.index("Active")])
+    pending_count = int(counts[BUCKETS.index("Pending")])
+    sold_window_count = int(sold_window_rows.size)
 
     # MOI
     den = (sold_window_count / 3.0) + pending_count
     moi = (active_count / den) if den > 0 else np.nan
 
     # Ranges
-    active_prices = df.loc[df["_bucket"] == "Active", "_list_price"].dropna()
-    pending_prices = df.loc[df["_bucket"] == "Pending", "_list_price"].dropna()
-    net_price = df["_close_price"] - (df["_concessions"] if has_concessions else 0)
-    sold_net_prices = net_price.loc[is_sold_window].dropna()
-
-    active_min = float(active_prices.min()) if not active_prices.empty else np.nan
-    active_max = float(active_prices.max()) if not active_prices.empty else np.nan
-    pending_min = float(pending_prices.min()) if not pending_prices.empty else np.nan
-    pending_max = float(pending_prices.max()) if not pending_prices.empty else np.nan
-    sold_net_min = float(sold_net_prices.min()) if not sold_net_prices.empty else np.nan
-    sold_net_max = float(sold_net_prices.max()) if not sold_net_prices.empty else np.nan
+    active_prices = list_price[bucket_codes == BUCKETS.index("Active")]
+    pending_prices = list_price[bucket_codes == BUCKETS.index("Pending")]
+    # Net prices only for the window rows, subtracted in float64 so a net price
+    # past float32's exact range is not rounded
+    window_concessions = concessions[sold_window_rows] if has_concessions else 0.0
+    sold_net_prices = np.subtract(close_price[sold_window_rows], window_concessions, dtype=np.float64)
 
     # DaysInMLS stats for solds in window
-    dom_series = df.loc[is_sold_window, "_dom"].dropna()
-    avg_dom = float(dom_series.mean()) if not dom_series.empty else np.nan
-    median_dom = float(dom_series.median()) if not dom_series.empty else np.nan
+    avg_dom, median_dom = _nan_mean_median(dom[sold_window_rows])
 
-    # DOCX report only (no charts)
-    out_dir = os.path.dirname(os.path.abspath(csv_path)) or "."
-    date_stamp = today.strftime("%Y%m%d")
-    out_docx = os.path.join(out_dir, f"Momentum_Report_{date_stamp}.docx")
+    stats.update({
+        "active_count": active_count,
+        "pending_count": pending_count,
+        "sold_window_count": sold_window_count,
+        "moi": moi,
+        "active_range": _nan_min_max(active_prices),
+        "pending_range": _nan_min_max(pending_prices),
+        "sold_net_range": _nan_min_max(sold_net_prices),
+        "avg_dom": avg_dom,
+        "median_dom": median_dom,
+    })
+    return stats
 
-    doc = Document()
-    title = doc.add_paragraph("Momentum Report")
-    title.runs[0].font.size = Pt(20)
-    title.runs[0].bold = True
-    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-    pdate = doc.add_paragraph(f"Report Date: {today.strftime('%B %d, %Y')}")
-    pdate.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    doc.add_paragraph("")
-
-    doc.add_paragraph("Summary", style=None).runs[0].bold = True
-    doc.add_paragraph(f"Active: {active_count}")
-    doc.add_paragraph(f"Pending: {pending_count}")
-    doc.add_paragraph(f"Solds (last {args.days}d): {sold_window_count}")
-    doc.add_paragraph(f"Months of Inventory (MOI): {moi:.3f}" if not np.isnan(moi) else "Months of Inventory (MOI): N/A")
-
-    doc.add_paragraph("Price Ranges", style=None).runs[0].bold = True
-    doc.add_paragraph(
-        f"Active List Price Range: ${active_min:,.0f} – ${active_max:,.0f}"
-        if not (np.isnan(active_min) or np.isnan(active_max)) else "Active List Price Range: N/A"
-    )
-    doc.add_paragraph(
-        f"Pending List Price Range: ${pending_min:,.0f} – ${pending_max:,.0f}"
-        if not (np.isnan(pending_min) or np.isnan(pending_max)) else "Pending List Price Range: N/A"
-    )
-    doc.add_paragraph(
-        f"Closed Net Price Range ({args.days}d): ${sold_net_min:,.0f} – ${sold_net_max:,.0f}"
-        if not (np.isnan(sold_net_min) or np.isnan(sold_net_max)) else f"Closed Net Price Range ({args.days}d): N/A"
-    )
+def _fmt_range(lo: float, hi: float) -> str:
+    return f"${lo:,.0f} – ${hi:,.0f}" if not (np.isnan(lo) or np.isnan(hi)) else "N/A"
 
-    doc.add_paragraph("Days in MLS (Closed, Window)", style=None).runs[0].bold = True
-    doc.add_paragraph(f"Average DaysInMLS: {avg_dom:.1f}" if not np.isnan(avg_dom) else "Average DaysInMLS: N/A")
-    doc.add_paragraph(f"Median DaysInMLS: {median_dom:.1f}" if not np.isnan(median_dom) else "Median DaysInMLS: N/A")
+def report_fields(stats: dict, days: int, today: date) -> dict:
+    # Template fields for make_template.py's layout; DOM lines are always shown here
+    return {
+        "REPORT_DATE": today.strftime("%B %d, %Y"),
+        "DAYS": days,
+        "ACTIVE_COUNT": stats["active_count"],
+        "PENDING_COUNT": stats["pending_count"],
+        "SOLD_WINDOW_COUNT": stats["sold_window_count"],
+        "MOI": f"{stats['moi']:.3f}" if not np.isnan(stats["moi"]) else "N/A",
+        "ACTIVE_RANGE": _fmt_range(*stats["active_range"]),
+        "PENDING_RANGE": _fmt_range(*stats["pending_range"]),
+        "SOLD_NET_RANGE": _fmt_range(*stats["sold_net_range"]),
+        "DOM_COLUMN": None,
+        "AVG_DOM": f"{stats['avg_dom']:.1f}" if not np.isnan(stats["avg_dom"]) else "N/A",
+        "MEDIAN_DOM": f"{stats['median_dom']:.1f}" if not np.isnan(stats["median_dom"]) else "N/A",
+        "DOM_MISSING": None,
+    }
 
-    doc.add_paragraph("")
-    doc.add_paragraph("Formula", style=None).runs[0].bold = True
-    doc.add_paragraph(f"MOI = Active / ((Solds_{args.days}d / 3) + Pending)")
+def build_docx(df: pd.DataFrame, days: int, today: date) -> bytes:
+    stats = compute_stats(df, days, today, find_dom_column(df))
+    return render_docx(report_fields(stats, days, today))
 
-    doc.add_paragraph("")
-    doc.add_paragraph("Disclaimer", style=None).runs[0].bold = True
-    doc.add_paragraph(
-        "This report is generated from the provided MLS export. Field names are expected to match the fixed set; "
-        "optional fields like Seller Concessions and DaysInMLS may be omitted."
-    )
+def main():
+    parser = argparse.ArgumentParser(description="Generate Momentum Report from MLS CSV (no charts).")
+    parser.add_argument("csv_path", help="Path to the CSV file with required fields.")
+    parser.add_argument("--days", type=int, default=90, help="Window (days) for solds, default 90.")
+    args = parser.parse_args()
+
+    csv_path = args.csv_path
+    if not os.path.exists(csv_path):
+        raise SystemExit(f"File not found: {csv_path}")
+
+    df = read_mls_csv(csv_path)
+
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise SystemExit(f"Missing required columns: {missing}")
+
+    # DOCX report only (no charts)
+    today = datetime.today().date()
+    out_dir = os.path.dirname(os.path.abspath(csv_path)) or "."
+    date_stamp = today.strftime("%Y%m%d")
+    out_docx = os.path.join(out_dir, f"Momentum_Report_{date_stamp}.docx")
 
-    doc.save(out_docx)
+    with open(out_docx, "wb") as f:
+        f.write(build_docx(df, args.days, today))
     print("Report saved:", out_docx)
 
 if __name__ == "__main__":